@@ -0,0 +1,231 @@
+import os
+import sys
+import json
+import time
+import atexit
+import cProfile
+import pstats
+import threading
+from collections import Counter, deque
+
+class _NullSpan:
+    """Do-nothing span returned while tracing is off"""
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        return False
+
+_NULL_SPAN = _NullSpan()
+
+class _Span:
+    """Times one stage and records it as a Chrome-trace complete event"""
+    __slots__ = ('tracer', 'name', 'args', 'start', 'profile')
+
+    def __init__(self, tracer, name, args):
+        self.tracer = tracer
+        self.name = name
+        self.args = args
+        self.profile = None
+
+    def __enter__(self):
+        self.profile = self.tracer._enter_profiled()
+        self.start = time.perf_counter_ns()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        end = time.perf_counter_ns()
+        if self.profile is not None:
+            self.tracer._exit_profiled(self.profile)
+        if exc_type is not None:
+            self.args = dict(self.args or {}, error=exc_type.__name__)
+        self.tracer._record(self.name, self.start, end, self.args)
+        return False
+
+class Tracer:
+    PROFILE_MODES = ("cprofile", "sample")
+
+    def __init__(self, max_events=200000):
+        # Span tracing
+        self.enabled = False
+        self.trace_path = None
+        self.events = deque(maxlen=max_events)  # Oldest spans are dropped first
+        self.thread_names = {}  # {native tid: thread name}
+        self.epoch_ns = time.perf_counter_ns()
+        self.pid = os.getpid()
+
+        # Profiling window
+        self.profile_mode = None
+        self.profile_seconds = 30
+        self.profile_path = None
+        self.profiling = False
+        self.profiles = {}  # {tid: cProfile.Profile} for cprofile mode
+        self.samples = Counter()  # {collapsed stack: count} for sample mode
+        self.sample_interval = 0.005
+        self._local = threading.local()
+        self._stop_event = threading.Event()
+        self._profile_thread = None
+        self._lock = threading.Lock()  # Guards profiles
+
+    def configure(self, trace_path=None, profile_mode=None, profile_seconds=None, profile_path=None):
+        """Configure tracing/profiling (environment defaults are resolved by the caller)"""
+        if trace_path:
+            self.trace_path = trace_path
+            self.enabled = True
+            atexit.register(self.dump)
+
+        if profile_mode:
+            if profile_mode not in self.PROFILE_MODES:
+                raise ValueError(f"Unknown profile mode: {profile_mode} (expected one of {', '.join(self.PROFILE_MODES)})")
+            self.profile_mode = profile_mode
+            if profile_seconds is not None:
+                if profile_seconds <= 0:
+                    raise ValueError(f"Profile window must be positive, got {profile_seconds}")
+                self.profile_seconds = profile_seconds
+            default_ext = ".prof" if profile_mode == "cprofile" else ".folded"
+            self.profile_path = profile_path or f"p2p_profile{default_ext}"
+            # cProfile only runs inside spans, so spans must be live
+            if profile_mode == "cprofile":
+                self.enabled = True
+            # Flush a window still running at exit
+            atexit.register(self.stop_profile_window)
+
+    def span(self, name, **args):
+        """Return a context manager timing the enclosed stage"""
+        if not self.enabled:
+            return _NULL_SPAN
+        return _Span(self, name, args)
+
+    def _record(self, name, start_ns, end_ns, args):
+        """Store a finished span as a Chrome-trace complete event"""
+        if self.trace_path is None:
+            return
+        # Native ids, unlike get_ident(), are not quickly reused by short-lived threads
+        tid = threading.get_native_id()
+        self.thread_names[tid] = threading.current_thread().name
+        event = {
+            "name": name,
+            "cat": name.split(".", 1)[0],
+            "ph": "X",
+            "ts": (start_ns - self.epoch_ns) / 1000.0,
+            "dur": (end_ns - start_ns) / 1000.0,
+            "pid": self.pid,
+            "tid": tid
+        }
+        if args:
+            event["args"] = args
+        self.events.append(event)
+
+    def dump(self, path=None):
+        """Write recorded spans to a Chrome-trace JSON file (chrome://tracing, Perfetto)"""
+        path = path or self.trace_path
+        if not path:
+            return None
+
+        metadata = [
+            {"name": "thread_name", "ph": "M", "pid": self.pid, "tid": tid, "args": {"name": name}}
+            for tid, name in list(self.thread_names.items())
+        ]
+        with open(path, "w") as f:
+            json.dump({"traceEvents": metadata + list(self.events), "displayTimeUnit": "ms"}, f)
+        return path
+
+    def start_profile_window(self):
+        """Start the configured profiler for a fixed window of profile_seconds"""
+        if not self.profile_mode or self.profiling:
+            return False
+
+        self.profiling = True
+        self._stop_event.clear()
+        if self.profile_mode == "sample":
+            target = self._sample_loop
+        else:
+            target = self._cprofile_window
+        self._profile_thread = threading.Thread(target=target, name="p2p-profiler", daemon=True)
+        self._profile_thread.start()
+        return True
+
+    def stop_profile_window(self, timeout=2.0):
+        """End the profiling window early and wait for its results to be written"""
+        self._stop_event.set()
+        thread = self._profile_thread
+        if thread is not None and thread is not threading.current_thread():
+            thread.join(timeout)
+
+    def _enter_profiled(self):
+        """Enable this thread's cProfile around the outermost span during the window"""
+        if not self.profiling or self.profile_mode != "cprofile":
+            return None
+        depth = getattr(self._local, "depth", 0)
+        self._local.depth = depth + 1
+        if depth:
+            return None
+
+        tid = threading.get_ident()
+        with self._lock:
+            profile = self.profiles.get(tid)
+            if profile is None:
+                profile = self.profiles[tid] = cProfile.Profile()
+        try:
+            profile.enable()
+        except ValueError:
+            # Another profiler already owns the interpreter hook
+            self._local.depth = 0
+            return None
+        return profile
+
+    def _exit_profiled(self, profile):
+        profile.disable()
+        self._local.depth = 0
+
+    def _cprofile_window(self):
+        """Collect cProfile data from spans until the window closes, then write merged stats"""
+        self._stop_event.wait(self.profile_seconds)
+        self.profiling = False
+        # Spans were only live for cProfile unless tracing was requested too
+        self.enabled = self.trace_path is not None
+
+        with self._lock:
+            profiles = list(self.profiles.values())
+            self.profiles.clear()
+
+        stats = None
+        for profile in profiles:
+            try:
+                if stats is None:
+                    stats = pstats.Stats(profile)
+                else:
+                    stats.add(profile)
+            except TypeError:
+                # Profile never ran a span, nothing to merge
+                continue
+        if stats is not None:
+            stats.dump_stats(self.profile_path)
+
+    def _sample_loop(self):
+        """Sample every thread's stack until the window closes, then write collapsed stacks"""
+        own_tid = threading.get_ident()
+        deadline = time.monotonic() + self.profile_seconds
+
+        while time.monotonic() < deadline and not self._stop_event.wait(self.sample_interval):
+            names = {t.ident: t.name for t in threading.enumerate()}
+            for tid, frame in sys._current_frames().items():
+                if tid == own_tid:
+                    continue
+                stack = []
+                while frame is not None:
+                    code = frame.f_code
+                    stack.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{frame.f_lineno})")
+                    frame = frame.f_back
+                stack.append(names.get(tid, str(tid)))
+                self.samples[";".join(reversed(stack))] += 1
+
+        self.profiling = False
+        with open(self.profile_path, "w") as f:
+            for stack, count in self.samples.most_common():
+                f.write(f"{stack} {count}\n")
+
+# Shared tracer used by the network and UI code
+tracer = Tracer()
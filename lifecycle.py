@@ -0,0 +1,101 @@
+import socket
+import threading
+import time
+
+class ThreadLifecycle:
+    def __init__(self, shutdown_timeout=2.0):
+        # Set once shutdown starts, wakes every worker waiting on it
+        self.stop_event = threading.Event()
+        self.shutdown_timeout = shutdown_timeout
+        self.deadline = None  # time.monotonic() by which shutdown must finish
+
+        # Live workers and open sockets only, finished ones remove themselves
+        self.threads = set()
+        self.sockets = set()
+        self._lock = threading.Lock()
+
+    @property
+    def stopping(self):
+        return self.stop_event.is_set()
+
+    def spawn(self, target, args=(), name=None):
+        """Start a daemon worker that is tracked only while it is alive"""
+        thread = threading.Thread(target=self._run, args=(target, args), name=name, daemon=True)
+        with self._lock:
+            self.threads.add(thread)
+        try:
+            thread.start()
+        except Exception:
+            # A thread that never started must not be joined on shutdown
+            with self._lock:
+                self.threads.discard(thread)
+            raise
+        return thread
+
+    def _run(self, target, args):
+        try:
+            target(*args)
+        finally:
+            with self._lock:
+                self.threads.discard(threading.current_thread())
+
+    def remaining(self):
+        """Seconds left before the shutdown deadline (the full timeout if not started)"""
+        if self.deadline is None:
+            return self.shutdown_timeout
+        return max(0.0, self.deadline - time.monotonic())
+
+    def wait(self, timeout):
+        """Sleep for up to timeout seconds, returning True early if shutdown started"""
+        return self.stop_event.wait(timeout)
+
+    def register_socket(self, sock):
+        """Track a socket so shutdown can unblock calls waiting on it"""
+        with self._lock:
+            self.sockets.add(sock)
+        return sock
+
+    def unregister_socket(self, sock):
+        """Stop tracking a socket and close it"""
+        with self._lock:
+            self.sockets.discard(sock)
+        self._close_socket(sock)
+
+    def _close_socket(self, sock):
+        # shutdown() wakes threads blocked in recv/accept, close() alone may not
+        try:
+            sock.shutdown(socket.SHUT_RDWR)
+        except OSError:
+            pass
+        try:
+            sock.close()
+        except OSError:
+            pass
+
+    def shutdown(self, timeout=None):
+        """Stop all workers within a fixed deadline, returns threads still alive after it"""
+        if timeout is None:
+            timeout = self.shutdown_timeout
+        deadline = self.deadline = time.monotonic() + timeout
+
+        self.stop_event.set()
+
+        with self._lock:
+            sockets = list(self.sockets)
+            self.sockets.clear()
+        for sock in sockets:
+            self._close_socket(sock)
+
+        # Join against one shared deadline, not a per-thread timeout
+        with self._lock:
+            threads = list(self.threads)
+        current = threading.current_thread()
+        for thread in threads:
+            if thread is current or thread.ident is None:
+                continue
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            thread.join(remaining)
+
+        return [t for t in threads if t.is_alive() and t is not current]
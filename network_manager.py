@@ -1,5 +1,4 @@
 import socket
-import threading
 import time
 import platform
 import subprocess
@@ -8,6 +7,9 @@ from datetime import datetime
 import ipaddress
 import psutil
 
+from instrumentation import tracer
+from lifecycle import ThreadLifecycle
+
 class NetworkManager:
     def __init__(self, ui_components, nickname):
         # Store UI references
@@ -40,8 +42,9 @@ class NetworkManager:
         # Peer tracking
         self.peers = {}  # {ip: {'nickname': name, 'port': port, 'last_seen': timestamp}}
         
-        # Thread management
-        self.threads = []
+        # Thread management (live workers, client sockets and shutdown deadline,
+        # which also bounds the profiler flush in cleanup)
+        self.lifecycle = ThreadLifecycle(shutdown_timeout=2.0)
     
     def get_wifi_ip(self):
         """Get the IP address of the Wi-Fi adapter (only 192.168.x.x or 10.x.x.x)"""
@@ -94,15 +97,20 @@ class NetworkManager:
             self.udp_sock.setsockopt(socket.SOL_SOCKET, socket.SO_BROADCAST, 1)
             self.udp_sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
             self.udp_sock.bind((self.local_ip, self.UDP_PORT))
+            self.lifecycle.register_socket(self.udp_sock)
             
             # Start TCP server
             self.tcp_server = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
             self.tcp_server.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
             self.tcp_server.bind((self.local_ip, self.TCP_PORT))
             self.tcp_server.listen(10)
+            self.lifecycle.register_socket(self.tcp_server)
             
             self.running = True
             
+            # Start the profiling window if one was requested
+            tracer.start_profile_window()
+            
             # Start threads
             self.start_udp_discovery()
             self.start_udp_listener()
@@ -128,21 +136,15 @@ class NetworkManager:
     
     def start_udp_discovery(self):
         """Start thread to periodically broadcast presence"""
-        discovery_thread = threading.Thread(target=self.udp_discovery_loop, daemon=True)
-        discovery_thread.start()
-        self.threads.append(discovery_thread)
+        self.lifecycle.spawn(self.udp_discovery_loop, name="udp-discovery")
     
     def start_udp_listener(self):
         """Start thread to listen for peer discovery broadcasts"""
-        listener_thread = threading.Thread(target=self.udp_listener_loop, daemon=True)
-        listener_thread.start()
-        self.threads.append(listener_thread)
+        self.lifecycle.spawn(self.udp_listener_loop, name="udp-listener")
     
     def start_tcp_server(self):
         """Start thread to accept incoming TCP connections"""
-        server_thread = threading.Thread(target=self.tcp_server_loop, daemon=True)
-        server_thread.start()
-        self.threads.append(server_thread)
+        self.lifecycle.spawn(self.tcp_server_loop, name="tcp-server")
     
     def udp_discovery_loop(self):
         """Periodically broadcast presence to network"""
@@ -161,16 +163,19 @@ class NetworkManager:
                     ('<broadcast>', self.UDP_PORT)
                 )
             except Exception as e:
-                self.log_message(f"Discovery broadcast error: {str(e)}")
+                if self.running:
+                    self.log_message(f"Discovery broadcast error: {str(e)}")
             
-            # Wait before next broadcast
-            time.sleep(5)  # Broadcast every 5 seconds
+            # Wait before next broadcast, waking immediately on shutdown
+            if self.lifecycle.wait(5):  # Broadcast every 5 seconds
+                break
     
     def udp_listener_loop(self):
         """Listen for peer discovery broadcasts"""
         while self.running:
             try:
-                data, addr = self.udp_sock.recvfrom(1024)
+                with tracer.span("udp.recv"):
+                    data, addr = self.udp_sock.recvfrom(1024)
                 sender_ip = addr[0]
                 
                 # Skip our own broadcasts
@@ -179,7 +184,8 @@ class NetworkManager:
                 
                 # Process discovery packet
                 try:
-                    packet = json.loads(data.decode())
+                    with tracer.span("udp.parse", bytes=len(data)):
+                        packet = json.loads(data.decode())
                     
                     if packet.get("type") == "discovery":
                         nickname = packet.get("nickname", "Unknown")
@@ -212,14 +218,19 @@ class NetworkManager:
                 client_sock, addr = self.tcp_server.accept()
                 client_ip = addr[0]
                 
+                # Track the socket so shutdown can unblock its recv
+                self.lifecycle.register_socket(client_sock)
+                
                 # Start a new thread to handle this client
-                client_thread = threading.Thread(
-                    target=self.handle_tcp_client,
-                    args=(client_sock, client_ip),
-                    daemon=True
-                )
-                client_thread.start()
-                self.threads.append(client_thread)
+                try:
+                    self.lifecycle.spawn(
+                        self.handle_tcp_client,
+                        args=(client_sock, client_ip),
+                        name=f"tcp-client-{client_ip}"
+                    )
+                except Exception:
+                    self.lifecycle.unregister_socket(client_sock)
+                    raise
                 
             except Exception as e:
                 if not self.running:
@@ -230,13 +241,15 @@ class NetworkManager:
         """Handle communication with a connected TCP client"""
         try:
             while self.running:
-                data = client_sock.recv(1024)
+                with tracer.span("tcp.recv", peer=client_ip):
+                    data = client_sock.recv(1024)
                 if not data:
                     break
                 
                 # Process message
                 try:
-                    message_data = json.loads(data.decode())
+                    with tracer.span("tcp.parse", peer=client_ip, bytes=len(data)):
+                        message_data = json.loads(data.decode())
                     message_type = message_data.get("type", "message")
                     
                     if message_type == "message":
@@ -254,9 +267,10 @@ class NetworkManager:
                     self.log_message(f"Error processing message: {str(e)}")
                 
         except Exception as e:
-            self.log_message(f"TCP client handler error: {str(e)}")
+            if self.running:
+                self.log_message(f"TCP client handler error: {str(e)}")
         finally:
-            client_sock.close()
+            self.lifecycle.unregister_socket(client_sock)
     
     def send_message_to_peer(self, peer_ip, message):
         """Send a message to a specific peer"""
@@ -267,10 +281,12 @@ class NetworkManager:
         peer_info = self.peers[peer_ip]
         peer_port = peer_info.get("tcp_port", self.TCP_PORT)
         
+        tcp_client = None
         try:
             # Create TCP socket for sending
-            tcp_client = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
-            tcp_client.connect((peer_ip, peer_port))
+            tcp_client = self.lifecycle.register_socket(socket.socket(socket.AF_INET, socket.SOCK_STREAM))
+            with tracer.span("tcp.connect", peer=peer_ip):
+                tcp_client.connect((peer_ip, peer_port))
             
             # Create message packet
             timestamp = datetime.now().strftime("%H:%M:%S")
@@ -282,8 +298,10 @@ class NetworkManager:
             }
             
             # Send message
-            message_bytes = json.dumps(message_data).encode()
-            tcp_client.sendall(message_bytes)
+            with tracer.span("tcp.serialize"):
+                message_bytes = json.dumps(message_data).encode()
+            with tracer.span("tcp.sendall", bytes=len(message_bytes)):
+                tcp_client.sendall(message_bytes)
             
             # Update statistics
             self.bytes_sent += len(message_bytes)
@@ -292,12 +310,14 @@ class NetworkManager:
             # Display in our own chat
             self.display_message(timestamp, "You", peer_ip, message)
             
-            tcp_client.close()
             return True
             
         except Exception as e:
             self.log_message(f"Error sending message to {peer_ip}: {str(e)}")
             return False
+        finally:
+            if tcp_client is not None:
+                self.lifecycle.unregister_socket(tcp_client)
     
     def send_message_to_selected_peers(self, message):
         """Send a message to all selected peers in the listbox"""
@@ -330,39 +350,42 @@ class NetworkManager:
     
     def update_peers_list(self):
         """Update the peers listbox with current peers"""
-        # Clear current list
-        self.peers_listbox.delete(0, "end")
-        
-        # Add each peer
-        for ip, info in self.peers.items():
-            nickname = info.get("nickname", "Unknown")
-            self.peers_listbox.insert("end", f"{nickname} ({ip})")
+        with tracer.span("ui.update_peers", peers=len(self.peers)):
+            # Clear current list
+            self.peers_listbox.delete(0, "end")
+            
+            # Add each peer
+            for ip, info in self.peers.items():
+                nickname = info.get("nickname", "Unknown")
+                self.peers_listbox.insert("end", f"{nickname} ({ip})")
     
     def display_message(self, timestamp, sender, sender_ip, message):
         """Display a message in the chat window"""
-        self.message_display.insert("end", f"[{timestamp}] {sender} ({sender_ip}): {message}\n")
-        self.message_display.see("end")
+        with tracer.span("ui.display_message"):
+            self.message_display.insert("end", f"[{timestamp}] {sender} ({sender_ip}): {message}\n")
+            self.message_display.see("end")
     
     def log_message(self, message):
         """Log a system message to the chat window"""
         timestamp = datetime.now().strftime("%H:%M:%S")
-        self.message_display.insert("end", f"[{timestamp}] SYSTEM: {message}\n")
-        self.message_display.see("end")
+        with tracer.span("ui.log_message"):
+            self.message_display.insert("end", f"[{timestamp}] SYSTEM: {message}\n")
+            self.message_display.see("end")
     
     def cleanup(self):
         """Clean up resources when shutting down"""
         self.running = False
         
-        # Close sockets
-        if self.udp_sock:
-            self.udp_sock.close()
-        
-        if self.tcp_server:
-            self.tcp_server.close()
+        # Wake sleepers, close every tracked socket and join live workers
+        # against one deadline, however many connections there have been
+        stuck = self.lifecycle.shutdown()
         
-        # Wait for threads to finish
-        for thread in self.threads:
-            if thread.is_alive():
-                thread.join(0.5)  # Wait up to 0.5 seconds for each thread
+        if stuck:
+            self.log_message(f"P2P Chat stopped ({len(stuck)} thread(s) did not exit in time)")
+        else:
+            self.log_message("P2P Chat stopped")
         
-        self.log_message("P2P Chat stopped")
+        # Flush the profiling window within what is left of the same deadline;
+        # writing the trace file (only with --trace) is the one step outside it
+        tracer.stop_profile_window(timeout=self.lifecycle.remaining())
+        tracer.dump()
@@ -2,10 +2,13 @@ import tkinter as tk
 from tkinter import ttk, messagebox
 import threading
 import time
+import os
+import argparse
 from datetime import datetime
 
 from ui_styles import AppStyles
 from network_manager import NetworkManager
+from instrumentation import tracer
 
 class P2PChatApp:
     def __init__(self, root):
@@ -127,7 +130,44 @@ class P2PChatApp:
             self.network_manager.cleanup()
         self.root.destroy()
 
+def positive_float(value):
+    """argparse type for a number of seconds greater than zero"""
+    try:
+        seconds = float(value)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"invalid number: {value!r}")
+    if seconds <= 0:
+        raise argparse.ArgumentTypeError(f"must be greater than 0, got {value}")
+    return seconds
+
+def parse_args():
+    """Parse command line options for tracing and profiling, with environment defaults"""
+    parser = argparse.ArgumentParser(description="P2P Chat Application")
+    parser.add_argument("--trace", metavar="FILE", default=os.environ.get("P2P_TRACE"),
+                        help="record per-stage timing spans to a Chrome-trace JSON file (env: P2P_TRACE)")
+    parser.add_argument("--profile", choices=tracer.PROFILE_MODES, default=os.environ.get("P2P_PROFILE"),
+                        help="profile the network hot paths for a fixed window (env: P2P_PROFILE)")
+    parser.add_argument("--profile-seconds", type=positive_float, metavar="N",
+                        default=os.environ.get("P2P_PROFILE_SECONDS"),
+                        help="length of the profiling window in seconds, default 30 (env: P2P_PROFILE_SECONDS)")
+    parser.add_argument("--profile-out", metavar="FILE", default=os.environ.get("P2P_PROFILE_OUT"),
+                        help="where to write profiling results (env: P2P_PROFILE_OUT)")
+    args = parser.parse_args()
+
+    # argparse does not check defaults against choices, so validate the env value here
+    if args.profile and args.profile not in tracer.PROFILE_MODES:
+        parser.error(f"P2P_PROFILE: invalid choice: {args.profile!r} (choose from {', '.join(tracer.PROFILE_MODES)})")
+    return args
+
 if __name__ == "__main__":
+    args = parse_args()
+    tracer.configure(
+        trace_path=args.trace,
+        profile_mode=args.profile,
+        profile_seconds=args.profile_seconds,
+        profile_path=args.profile_out
+    )
+    
     root = tk.Tk()
     app = P2PChatApp(root)
     root.mainloop()
@@ -0,0 +1,85 @@
+import socket
+import threading
+import time
+import unittest
+from unittest import mock
+
+from lifecycle import ThreadLifecycle
+
+class ThreadLifecycleTest(unittest.TestCase):
+    def setUp(self):
+        self.lifecycle = ThreadLifecycle(shutdown_timeout=1.0)
+        self.release = threading.Event()
+
+    def tearDown(self):
+        # Let any deliberately stuck worker finish
+        self.release.set()
+
+    def test_finished_threads_untrack_themselves(self):
+        threads = [self.lifecycle.spawn(lambda: None) for _ in range(20)]
+        for thread in threads:
+            thread.join(1.0)
+        self.assertEqual(self.lifecycle.threads, set())
+
+    def test_failed_start_is_not_tracked(self):
+        with mock.patch.object(threading.Thread, "start", side_effect=RuntimeError("can't start new thread")):
+            with self.assertRaises(RuntimeError):
+                self.lifecycle.spawn(lambda: None)
+        self.assertEqual(self.lifecycle.threads, set())
+        self.assertEqual(self.lifecycle.shutdown(), [])
+
+    def test_shutdown_wakes_waiting_workers(self):
+        self.lifecycle.spawn(lambda: self.lifecycle.wait(60))
+        start = time.monotonic()
+        self.assertEqual(self.lifecycle.shutdown(), [])
+        self.assertLess(time.monotonic() - start, 0.5)
+
+    def test_shutdown_unblocks_recv(self):
+        peers = []
+        for _ in range(50):
+            ours, theirs = socket.socketpair()
+            peers.append(theirs)
+            self.lifecycle.register_socket(ours)
+            self.lifecycle.spawn(ours.recv, args=(1024,))
+
+        start = time.monotonic()
+        self.assertEqual(self.lifecycle.shutdown(), [])
+        self.assertLess(time.monotonic() - start, 0.5)
+        self.assertEqual(self.lifecycle.sockets, set())
+        for sock in peers:
+            sock.close()
+
+    def test_shutdown_unblocks_accept(self):
+        server = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        server.bind(("127.0.0.1", 0))
+        server.listen(1)
+        self.lifecycle.register_socket(server)
+
+        def accept():
+            try:
+                server.accept()
+            except OSError:
+                pass
+
+        self.lifecycle.spawn(accept)
+        time.sleep(0.05)
+        self.assertEqual(self.lifecycle.shutdown(), [])
+
+    def test_shutdown_deadline_is_shared(self):
+        # Uncooperative workers must not add up to one timeout each
+        for _ in range(20):
+            self.lifecycle.spawn(self.release.wait)
+
+        start = time.monotonic()
+        stuck = self.lifecycle.shutdown(timeout=0.2)
+        elapsed = time.monotonic() - start
+
+        self.assertEqual(len(stuck), 20)
+        self.assertLess(elapsed, 0.5)
+        self.assertEqual(self.lifecycle.remaining(), 0.0)
+
+    def test_remaining_before_shutdown(self):
+        self.assertEqual(self.lifecycle.remaining(), 1.0)
+
+if __name__ == "__main__":
+    unittest.main()